@@ -269,6 +269,7 @@ class Compound(object):
         self._rigid_id = None
         self._contains_rigid = False
         self._check_if_contains_rigid_bodies = False
+        self._residue_parents = None
 
         # self.add() must be called after labels and children are initialized.
         if subcompounds:
@@ -382,6 +383,49 @@ class Compound(object):
             return self
         return parent
 
+    @property
+    def residue_names(self):
+        """Names of the Compounds that directly contain the particles.
+
+        Returns
+        -------
+        frozenset of str
+            The names of the parents of all particles in the Compound, suitable
+            for the `residues` argument of `to_parmed` and `save`
+
+        Notes
+        -----
+        The parents of the particles are cached, and the cache is cleared
+        whenever a Compound is added or removed anywhere below self in the
+        hierarchy. Their names are read on every call, so renamed Compounds
+        are always reported correctly.
+
+        """
+        if not self.children:
+            return frozenset([self.parent.name] if self.parent else [])
+        if self._residue_parents is None:
+            self._residue_parents = tuple(
+                set(particle.parent for particle in self.particles()))
+        return frozenset(parent.name for parent in self._residue_parents)
+
+    def _invalidate_residue_names(self):
+        """Clear the cached residue parents of self and its ancestors. """
+        self._residue_parents = None
+        for ancestor in self.ancestors():
+            ancestor._residue_parents = None
+
+    def prefix_names(self, prefix):
+        """Prepend a string to the names of all Particles of the Compound.
+
+        Parameters
+        ----------
+        prefix : str
+            The string to prepend to each Particle name
+
+        """
+        for particle in self.particles():
+            particle.name = prefix + particle.name
+
     def particles_by_name(self, name):
         """Return all Particles of the Compound with a specific name
 
@@ -694,6 +738,7 @@ class Compound(object):
                     new_child, new_child.parent))
             self.children.add(new_child)
             new_child.parent = self
+            self._invalidate_residue_names()
 
             if new_child.bond_graph is not None:
                 if self.root.bond_graph is None:
@@ -750,6 +795,8 @@ class Compound(object):
         remove_from_here = objs_to_remove.intersection(self.children)
         self.children -= remove_from_here
         yet_to_remove = objs_to_remove - remove_from_here
+        if remove_from_here:
+            self._invalidate_residue_names()
 
         for removed in remove_from_here:
             for child in removed.children:
@@ -1733,7 +1780,8 @@ class Compound(object):
     def save(self, filename, show_ports=False, forcefield_name=None,
              forcefield_files=None, forcefield_debug=False, box=None,
              overwrite=False, residues=None, references_file=None,
-             combining_rule='lorentz', foyerkwargs={}, **kwargs):
+             combining_rule='lorentz', foyerkwargs={}, forcefield=None,
+             **kwargs):
         """Save the Compound to a file.
 
         Parameters
@@ -1761,7 +1809,7 @@ class Compound(object):
             overlapping atoms.
         overwrite : bool, optional, default=False
             Overwrite if the filename already exists
-        residues : str of list of str
+        residues : str or iterable of str
             Labels of residues in the Compound. Residues are assigned by
             checking against Compound.name.
         references_file : str, optional, default=None
@@ -1778,6 +1826,10 @@ class Compound(object):
         ----------------
         foyerkwargs : dict, optional
             Specify keyword arguments when applying the foyer Forcefield
+        forcefield : foyer.Forcefield or str, optional, default=None
+            An already constructed foyer Forcefield to apply, e.g. to reuse one
+            across several saves. Takes precedence over `forcefield_name` and
+            `forcefield_files`. A str is taken as a `forcefield_name`.
         ref_distance : float, optional, default=1.0
             Normalization factor used when saving to .gsd and .hoomdxml formats
             for converting distance values to reduced units.
@@ -1823,12 +1875,20 @@ class Compound(object):
         structure = self.to_parmed(box=box, residues=residues,
                                    show_ports=show_ports)
         # Apply a force field with foyer if specified
-        if forcefield_name or forcefield_files:
-            foyer = import_('foyer')
-            ff = foyer.Forcefield(forcefield_files=forcefield_files,
-                                  name=forcefield_name, debug=forcefield_debug)
-            structure = ff.apply(structure, references_file=references_file,
-                    **foyerkwargs)
+        if isinstance(forcefield, string_types):
+            forcefield_name, forcefield = forcefield, None
+        elif forcefield is not None and not hasattr(forcefield, 'apply'):
+            raise TypeError('forcefield must be a foyer.Forcefield or the '
+                            'name of one, not {}'.format(type(forcefield)))
+        if forcefield is not None or forcefield_name or forcefield_files:
+            if forcefield is None:
+                foyer = import_('foyer')
+                forcefield = foyer.Forcefield(forcefield_files=forcefield_files,
+                                              name=forcefield_name,
+                                              debug=forcefield_debug)
+            structure = forcefield.apply(structure,
+                                         references_file=references_file,
+                                         **foyerkwargs)
             structure.combining_rule = combining_rule
 
         total_charge = sum([atom.charge for atom in structure])
@@ -1969,7 +2029,7 @@ class Compound(object):
             Include all port atoms when converting to trajectory.
         chains : mb.Compound or list of mb.Compound
             Chain types to add to the topology
-        residues : str of list of str
+        residues : str or iterable of str
             Labels of residues in the Compound. Residues are assigned by
             checking against Compound.name.
         box : mb.Box, optional, default=self.boundingbox (with buffer)
@@ -2022,7 +2082,7 @@ class Compound(object):
             Atoms to include in the topology
         chains : mb.Compound or list of mb.Compound
             Chain types to add to the topology
-        residues : str of list of str
+        residues : str or iterable of str
             Labels of residues in the Compound. Residues are assigned by
             checking against Compound.name.
 
@@ -2044,8 +2104,8 @@ class Compound(object):
 
         if isinstance(residues, string_types):
             residues = [residues]
-        if isinstance(residues, (list, set)):
-            residues = tuple(residues)
+        if isinstance(residues, (list, tuple, set)):
+            residues = frozenset(residues)
         top = Topology()
         atom_mapping = {}
 
@@ -2209,7 +2269,7 @@ class Compound(object):
             box lengths.
         title : str, optional, default=self.name
             Title/name of the ParmEd Structure
-        residues : str of list of str
+        residues : str or iterable of str
             Labels of residues in the Compound. Residues are assigned by
             checking against Compound.name.
         show_ports : boolean, optional, default=False
@@ -2237,8 +2297,8 @@ class Compound(object):
 
         if isinstance(residues, string_types):
             residues = [residues]
-        if isinstance(residues, (list, set)):
-            residues = tuple(residues)
+        if isinstance(residues, (list, tuple, set)):
+            residues = frozenset(residues)
 
         default_residue = pmd.Residue('RES')
         port_residue = pmd.Residue('PRT')
@@ -2502,6 +2562,7 @@ class Compound(object):
             self._check_if_contains_rigid_bodies)
         newone._contains_rigid = deepcopy(self._contains_rigid)
         newone._rigid_id = deepcopy(self._rigid_id)
+        newone._residue_parents = None
         newone._charge = deepcopy(self._charge)
         if hasattr(self, 'index'):
             newone.index = deepcopy(self.index)
@@ -1,11 +1,14 @@
 from __future__ import division
 
 from collections import OrderedDict
+from contextlib import contextmanager
 from warnings import warn
-import itertools as it
+import io
+import itertools
 
 import numpy as np
 from parmed.parameters import ParameterSet
+from six import string_types
 
 from mbuild import Box
 from mbuild.utils.conversion import RB_to_OPLS
@@ -13,6 +16,48 @@ from mbuild.utils.sorting import natural_sort
 
 __all__ = ['write_lammpsdata']
 
+# Columns of the Atoms section for each supported atom style
+_ATOM_COLUMNS = {
+    'atomic': ('index', 'type', 'x', 'y', 'z'),
+    'charge': ('index', 'type', 'charge', 'x', 'y', 'z'),
+    'molecular': ('index', 'molecule', 'type', 'x', 'y', 'z'),
+    'full': ('index', 'molecule', 'type', 'charge', 'x', 'y', 'z'),
+}
+_COLUMN_FORMATS = {
+    'index': '%d',
+    'molecule': '%d',
+    'type': '%d',
+    'charge': '%.6f',
+    'x': '%.6f',
+    'y': '%.6f',
+    'z': '%.6f',
+}
+
+
+def _make_atom_writer(atom_style):
+    """Return a function writing the Atoms section rows of `atom_style`.
+
+    The returned function takes a `write` function and a dict mapping 'type',
+    'charge', 'x', 'y' and 'z' to per-atom lists, and writes only the columns
+    used by `atom_style`.
+    """
+    atom_columns = _ATOM_COLUMNS[atom_style]
+    atom_line = ('\t'.join(_COLUMN_FORMATS[name] for name in atom_columns)
+                 + '\n').__mod__
+
+    def write_atoms(write, atoms):
+        n_atoms = len(atoms['type'])
+        columns = dict(atoms, index=range(1, n_atoms+1),
+                       molecule=itertools.repeat(0, n_atoms))
+        rows = zip(*[columns[name] for name in atom_columns])
+        write(''.join(map(atom_line, rows)))
+
+    return write_atoms
+
+
+_ATOM_WRITERS = dict((atom_style, _make_atom_writer(atom_style))
+                     for atom_style in _ATOM_COLUMNS)
+
 
 def write_lammpsdata(structure, filename, atom_style='full', 
                     detect_forcefield_style=True, nbfix_in_data_file=True,
@@ -28,8 +73,9 @@ def write_lammpsdata(structure, filename, atom_style='full',
     ----------
     structure : parmed.Structure
         ParmEd structure object
-    filename : str
-        Path of the output file
+    filename : str or file-like object
+        Path of the output file, or an open text or binary stream to write
+        to. Streams are not closed.
     atom_style: str
         Defines the style of atoms to be saved in a LAMMPS data file. The following atom
         styles are currently supported: 'full', 'atomic', 'charge', 'molecular'
@@ -61,17 +107,31 @@ def write_lammpsdata(structure, filename, atom_style='full',
 
     """
 
-    if atom_style not in ['atomic', 'charge', 'molecular', 'full']:
+    if atom_style not in _ATOM_COLUMNS:
         raise ValueError('Atom style "{}" is invalid or is not currently supported'.format(atom_style))
 
-    xyz = np.array([[atom.xx,atom.xy,atom.xz] for atom in structure.atoms])
-
     forcefield = True
     if structure[0].type == '':
         forcefield = False
 
+    # Gather per-atom data in a single pass over the structure. Masses and
+    # nonbonded parameters are per type, so they are read later from one
+    # atom of each type only. Coordinates and charges are only formatted into
+    # the Atoms section, so they are kept as lists.
+    n_atoms = len(structure.atoms)
+    xs, ys, zs = [None] * n_atoms, [None] * n_atoms, [None] * n_atoms
+    charges = [None] * n_atoms
+    atom_types = [None] * n_atoms
+    names = [None] * n_atoms
+    for i, atom in enumerate(structure.atoms):
+        xs[i], ys[i], zs[i] = atom.xx, atom.xy, atom.xz
+        charges[i] = atom.charge
+        atom_types[i] = atom.type
+        names[i] = atom.name
+    types = atom_types if forcefield else names
+
     # Internally use nm
-    box = Box(lengths=np.array([0.1 * val for val in structure.box[0:3]]),
+    box = Box(lengths=0.1 * np.asarray(structure.box[0:3]),
               angles=structure.box[3:6])
     """
     Note:
@@ -105,17 +165,12 @@ def write_lammpsdata(structure, filename, atom_style='full',
             atomtype 3 : dihedral.atom3.type
             atomtype 4 : dihedral.atom4.type
     """
-    if forcefield:
-        types = [atom.type for atom in structure.atoms]
-    else:
-        types = [atom.name for atom in structure.atoms]
-
-    unique_types = list(set(types))
-    unique_types.sort(key=natural_sort)
+    unique_types = sorted(set(types), key=natural_sort)
+    type_to_id = dict((atom_type, i+1) for i, atom_type in enumerate(unique_types))
+    type_ids = np.fromiter((type_to_id[atom_type] for atom_type in types),
+                           dtype=np.int32, count=n_atoms)
 
-    charges = [atom.charge for atom in structure.atoms]
 
-    
     # Lammps syntax depends on the functional form
     # Infer functional form based on the properties of the structure
     if detect_forcefield_style:
@@ -143,172 +198,163 @@ def write_lammpsdata(structure, filename, atom_style='full',
                          "Forcefield XML and structure")
 
 
-    bonds = [[bond.atom1.idx+1, bond.atom2.idx+1] for bond in structure.bonds]
-    angles = [[angle.atom1.idx+1,
-               angle.atom2.idx+1,
-               angle.atom3.idx+1] for angle in structure.angles]
+    bonds = _atom_indices(structure.bonds, 2)
+    angles = _atom_indices(structure.angles, 3)
     if use_rb_torsions:
-        dihedrals = [[dihedral.atom1.idx+1,
-                      dihedral.atom2.idx+1,
-                      dihedral.atom3.idx+1,
-                      dihedral.atom4.idx+1] for dihedral in structure.rb_torsions]
+        dihedrals = _atom_indices(structure.rb_torsions, 4)
     elif use_dihedrals:
-        dihedrals = [[dihedral.atom1.idx+1,
-                      dihedral.atom2.idx+1,
-                      dihedral.atom3.idx+1,
-                      dihedral.atom4.idx+1] for dihedral in structure.dihedrals]
+        dihedrals = _atom_indices(structure.dihedrals, 4)
     else:
-        dihedrals = []
-    impropers = [[improper.atom1.idx+1,
-                  improper.atom2.idx+1,
-                  improper.atom3.idx+1,
-                  improper.atom4.idx+1] for improper in structure.impropers]
-
+        dihedrals = _atom_indices([], 4)
+    impropers = _atom_indices(structure.impropers, 4)
 
+    # Integer codes of the atom types, ordered like the type names so that
+    # sorting codes also sorts the names
+    type_codes = np.unique(atom_types, return_inverse=True)[1].reshape(-1)
 
-    if bonds:
+    if len(bonds):
         if len(structure.bond_types) == 0:
             bond_types = np.ones(len(bonds),dtype=int)
         else:
-            unique_bond_types = dict(enumerate(set([(round(bond.type.k,3),
-                                                     round(bond.type.req,3),
-                                                     tuple(sorted((bond.atom1.type,bond.atom2.type)))
-                                                     ) for bond in structure.bonds])))
-            unique_bond_types = OrderedDict([(y,x+1) for x,y in unique_bond_types.items()])
-            bond_types = [unique_bond_types[(round(bond.type.k,3),
-                                             round(bond.type.req,3),
-                                             tuple(sorted((bond.atom1.type,bond.atom2.type)))
-                                             )] for bond in structure.bonds]
-
-    if angles:
+            bond_params = _round_columns([(bond.type.k, bond.type.req)
+                                          for bond in structure.bonds], 3)
+            first, bond_types = _enumerate_unique_rows(np.column_stack((
+                bond_params, np.sort(type_codes[bonds-1], axis=1))))
+            unique_bond_types = OrderedDict(
+                ((k, req,
+                  tuple(sorted((atom_types[i],atom_types[j])))
+                  ), n+1) for n, ((k, req), (i, j)) in enumerate(zip(
+                      bond_params[first].tolist(), (bonds[first]-1).tolist())))
+
+    if len(angles):
         if use_urey_bradleys:
-            charmm_angle_types = []
-            for angle in structure.angles:
-                ub_k = 0
-                ub_req = 0
-                for ub in structure.urey_bradleys:
-                    if (angle.atom1, angle.atom3) == (ub.atom1, ub.atom2):
-                        ub_k = ub.type.k
-                        ub_req = ub.type.req
-                charmm_angle_types.append((round(angle.type.k,3), 
-                                           round(angle.type.theteq,3),
-                                           round(ub_k, 3),
-                                           round(ub_req, 3),
-                                           tuple(sorted((angle.atom1.type,angle.atom3.type)))))
-
-            unique_angle_types = dict(enumerate(set(charmm_angle_types)))
-            unique_angle_types = OrderedDict([(y,x+1) for x,y in unique_angle_types.items()])
-            angle_types = [unique_angle_types[ub_info] for ub_info in charmm_angle_types]
-
+            ub_params = dict(((ub.atom1, ub.atom2), (ub.type.k, ub.type.req))
+                             for ub in structure.urey_bradleys)
+            angle_params = _round_columns(
+                [(angle.type.k, angle.type.theteq) +
+                 ub_params.get((angle.atom1, angle.atom3), (0, 0))
+                 for angle in structure.angles], 3)
+            first, angle_types = _enumerate_unique_rows(np.column_stack((
+                angle_params, np.sort(type_codes[angles[:, [0, 2]]-1], axis=1))))
+            unique_angle_types = OrderedDict(
+                (tuple(params) +
+                 (tuple(sorted((atom_types[i],atom_types[k]))),), n+1)
+                for n, (params, (i, j, k)) in enumerate(zip(
+                    angle_params[first].tolist(), (angles[first]-1).tolist())))
 
         else:
-            unique_angle_types = dict(enumerate(set([(round(angle.type.k,3),
-                                                      round(angle.type.theteq,3),
-                                                      angle.atom2.type,
-                                                      tuple(sorted((angle.atom1.type,angle.atom3.type)))
-                                                      ) for angle in structure.angles])))
-            unique_angle_types = OrderedDict([(y,x+1) for x,y in unique_angle_types.items()])
-            angle_types = [unique_angle_types[(round(angle.type.k,3),
-                                               round(angle.type.theteq,3),
-                                               angle.atom2.type,
-                                               tuple(sorted((angle.atom1.type,angle.atom3.type)))
-                                               )] for angle in structure.angles]
-
-    if dihedrals:
+            angle_params = _round_columns([(angle.type.k, angle.type.theteq)
+                                           for angle in structure.angles], 3)
+            first, angle_types = _enumerate_unique_rows(np.column_stack((
+                angle_params, type_codes[angles[:, 1]-1],
+                np.sort(type_codes[angles[:, [0, 2]]-1], axis=1))))
+            unique_angle_types = OrderedDict(
+                ((k, theteq,
+                  atom_types[j],
+                  tuple(sorted((atom_types[i],atom_types[l])))
+                  ), n+1) for n, ((k, theteq), (i, j, l)) in enumerate(zip(
+                      angle_params[first].tolist(), (angles[first]-1).tolist())))
+
+    if len(dihedrals):
         if use_rb_torsions:
-            unique_dihedral_types = dict(enumerate(set([(round(dihedral.type.c0,3),
-                                                         round(dihedral.type.c1,3),
-                                                         round(dihedral.type.c2,3),
-                                                         round(dihedral.type.c3,3),
-                                                         round(dihedral.type.c4,3),
-                                                         round(dihedral.type.c5,3),
-                                                         round(dihedral.type.scee,1),
-                                                         round(dihedral.type.scnb,1),
-                                                         dihedral.atom1.type, dihedral.atom2.type,
-                                                         dihedral.atom3.type, dihedral.atom4.type
-                                                         ) for dihedral in structure.rb_torsions])))
-            unique_dihedral_types = OrderedDict([(y,x+1) for x,y in unique_dihedral_types.items()])
-            dihedral_types = [unique_dihedral_types[(round(dihedral.type.c0,3),
-                                                     round(dihedral.type.c1,3),
-                                                     round(dihedral.type.c2,3),
-                                                     round(dihedral.type.c3,3),
-                                                     round(dihedral.type.c4,3),
-                                                     round(dihedral.type.c5,3),
-                                                     round(dihedral.type.scee,1),
-                                                     round(dihedral.type.scnb,1),
-                                                     dihedral.atom1.type, dihedral.atom2.type,
-                                                     dihedral.atom3.type, dihedral.atom4.type
-                                                     )] for dihedral in structure.rb_torsions]
-            
+            dihedral_params = _round_columns(
+                [(dihedral.type.c0, dihedral.type.c1, dihedral.type.c2,
+                  dihedral.type.c3, dihedral.type.c4, dihedral.type.c5,
+                  dihedral.type.scee, dihedral.type.scnb)
+                 for dihedral in structure.rb_torsions],
+                [3, 3, 3, 3, 3, 3, 1, 1])
+            first, dihedral_types = _enumerate_unique_rows(np.column_stack((
+                dihedral_params, type_codes[dihedrals-1])))
+            unique_dihedral_types = OrderedDict(
+                (tuple(params) +
+                 (atom_types[i], atom_types[j],
+                  atom_types[k], atom_types[l]), n+1)
+                for n, (params, (i, j, k, l)) in enumerate(zip(
+                    dihedral_params[first].tolist(), (dihedrals[first]-1).tolist())))
+
         elif use_dihedrals:
             charmm_dihedrals = []
+            append = charmm_dihedrals.append
             structure.join_dihedrals()
             for dihedral in structure.dihedrals:
                 if not dihedral.improper:
-                    weight = 1 / len(dihedral.type)
+                    # Shared by every term of this dihedral
+                    weight = round(1 / len(dihedral.type), 4)
+                    dihedral_atom_types = (dihedral.atom1.type, dihedral.atom2.type,
+                                           dihedral.atom3.type, dihedral.atom4.type)
                     for dih_type in dihedral.type:
-                        charmm_dihedrals.append((round(dih_type.phi_k,3),
-                                                 int(round(dih_type.per,0)),
-                                                 int(round(dih_type.phase,0)),
-                                                 round(weight, 4),
-                                                 round(dih_type.scee,1),
-                                                 round(dih_type.scnb,1),
-                                                 dihedral.atom1.type, dihedral.atom2.type,
-                                                 dihedral.atom3.type, dihedral.atom4.type))
-
-            unique_dihedral_types = dict(enumerate(set(charmm_dihedrals)))
-            unique_dihedral_types = OrderedDict([(y,x+1) for x,y in unique_dihedral_types.items()])
-            dihedral_types = [unique_dihedral_types[dihedral_info] for dihedral_info in charmm_dihedrals]
-            
-    if impropers:
-            unique_improper_types = dict(enumerate(set([(round(improper.type.psi_k,3),
-                                                         round(improper.type.psi_eq,3),
-                                                         improper.atom1.type, improper.atom2.type,
-                                                         improper.atom3.type, improper.atom4.type) for improper in structure.impropers])))
-            unique_improper_types = OrderedDict([(y,x+1) for x,y in unique_improper_types.items()])
-            improper_types = [unique_improper_types[(round(improper.type.psi_k,3),
-                                                     round(improper.type.psi_eq,3),
-                                                     improper.atom1.type, improper.atom2.type,
-                                                     improper.atom3.type, improper.atom4.type)] for improper in structure.impropers]
-        
-    with open(filename, 'w') as data:
-        data.write(filename+' - created by mBuild\n\n')
-        data.write('{:d} atoms\n'.format(len(structure.atoms)))
+                        append((round(dih_type.phi_k,3),
+                                int(round(dih_type.per,0)),
+                                int(round(dih_type.phase,0)),
+                                weight,
+                                round(dih_type.scee,1),
+                                round(dih_type.scnb,1)) + dihedral_atom_types)
+
+            unique_dihedral_types, dihedral_types = _enumerate_unique(charmm_dihedrals)
+
+    if len(impropers):
+        improper_params = _round_columns([(improper.type.psi_k, improper.type.psi_eq)
+                                          for improper in structure.impropers], 3)
+        first, improper_types = _enumerate_unique_rows(np.column_stack((
+            improper_params, type_codes[impropers-1])))
+        unique_improper_types = OrderedDict(
+            ((psi_k, psi_eq,
+              atom_types[i], atom_types[j],
+              atom_types[k], atom_types[l]
+              ), n+1) for n, ((psi_k, psi_eq), (i, j, k, l)) in enumerate(zip(
+                  improper_params[first].tolist(), (impropers[first]-1).tolist())))
+
+    with _maybe_open(filename) as data:
+        write, writelines = _writers(data)
+
+        # The header and box are short, so collect them and write them once
+        header = []
+        add = header.append
+        name = getattr(data, 'name', None)
+        if not isinstance(name, string_types):
+            name = 'LAMMPS data file'
+        add('{} - created by mBuild\n\n'.format(name))
+        add('{:d} atoms\n'.format(n_atoms))
         if atom_style in ['full', 'molecular']:
-            data.write('{:d} bonds\n'.format(len(bonds)))
-            data.write('{:d} angles\n'.format(len(angles)))
-            data.write('{:d} dihedrals\n'.format(len(dihedrals)))
-            data.write('{:d} impropers\n\n'.format(len(impropers)))
+            add('{:d} bonds\n'.format(len(bonds)))
+            add('{:d} angles\n'.format(len(angles)))
+            add('{:d} dihedrals\n'.format(len(dihedrals)))
+            add('{:d} impropers\n\n'.format(len(impropers)))
 
-        data.write('{:d} atom types\n'.format(len(set(types))))
+        add('{:d} atom types\n'.format(len(unique_types)))
         if atom_style in ['full', 'molecular']:
-            if bonds:
-                data.write('{:d} bond types\n'.format(len(set(bond_types))))
-            if angles:
-                data.write('{:d} angle types\n'.format(len(set(angle_types))))
-            if dihedrals:
-                data.write('{:d} dihedral types\n'.format(len(set(dihedral_types))))
-            if impropers:
-                data.write('{:d} improper types\n'.format(len(set(improper_types))))
-
-
-        data.write('\n')
+            if len(bonds):
+                if len(structure.bond_types) == 0:
+                    add('1 bond types\n')
+                else:
+                    add('{:d} bond types\n'.format(len(unique_bond_types)))
+            if len(angles):
+                add('{:d} angle types\n'.format(len(unique_angle_types)))
+            if len(dihedrals):
+                add('{:d} dihedral types\n'.format(len(unique_dihedral_types)))
+            if len(impropers):
+                add('{:d} improper types\n'.format(len(unique_improper_types)))
+
+        add('\n')
         # Box data
-        if np.allclose(box.angles, np.array([90, 90, 90])):
+        # Same tolerance as np.allclose(box.angles, 90)
+        tol = 1e-8 + 1e-5 * 90
+        alpha, beta, gamma = box.angles
+        if abs(alpha - 90) <= tol and abs(beta - 90) <= tol and abs(gamma - 90) <= tol:
+            mins = 10.0 * box.mins
+            maxs = 10.0 * box.maxs
             for i,dim in enumerate(['x','y','z']):
-                data.write('{0:.6f} {1:.6f} {2}lo {2}hi\n'.format(
-                    10.0 * box.mins[i],
-                    10.0 * box.maxs[i],
-                    dim))
+                add('{0:.6f} {1:.6f} {2}lo {2}hi\n'.format(
+                    mins[i], maxs[i], dim))
         else:
             a, b, c = 10.0 * box.lengths
-            alpha, beta, gamma = np.radians(box.angles)
+            cos_alpha, cos_beta, cos_gamma = np.cos(np.radians(box.angles))
 
             lx = a
-            xy = b * np.cos(gamma)
-            xz = c * np.cos(beta)
+            xy = b * cos_gamma
+            xz = c * cos_beta
             ly = np.sqrt(b**2 - xy**2)
-            yz = (b*c*np.cos(alpha) - xy*xz) / ly
+            yz = (b*c*cos_alpha - xy*xz) / ly
             lz = np.sqrt(c**2 - xz**2 - yz**2)
 
             xlo, ylo, zlo = 10.0 * box.mins
@@ -323,33 +369,36 @@ def write_lammpsdata(structure, filename, atom_style='full',
             zlo_bound = zlo
             zhi_bound = zhi
 
-            data.write('{0:.6f} {1:.6f} xlo xhi\n'.format(
+            add('{0:.6f} {1:.6f} xlo xhi\n'.format(
                 xlo_bound, xhi_bound))
-            data.write('{0:.6f} {1:.6f} ylo yhi\n'.format(
+            add('{0:.6f} {1:.6f} ylo yhi\n'.format(
                 ylo_bound, yhi_bound))
-            data.write('{0:.6f} {1:.6f} zlo zhi\n'.format(
+            add('{0:.6f} {1:.6f} zlo zhi\n'.format(
                 zlo_bound, zhi_bound))
-            data.write('{0:.6f} {1:.6f} {2:6f} xy xz yz\n'.format(
+            add('{0:.6f} {1:.6f} {2:6f} xy xz yz\n'.format(
                 xy, xz, yz))
+        write(''.join(header))
 
         # Mass data
-        masses = [atom.mass for atom in structure.atoms]
-        mass_dict = dict([(unique_types.index(atom_type)+1,mass) for atom_type,mass in zip(types,masses)])
-
-        data.write('\nMasses\n\n')
-        for atom_type,mass in mass_dict.items():
-            data.write('{:d}\t{:.6f}\t# {}\n'.format(atom_type,mass,unique_types[atom_type-1]))
+        # One representative atom of each type, in order of first appearance
+        type_atoms = np.sort(np.unique(type_ids, return_index=True)[1])
+        type_atom_ids = type_ids[type_atoms].tolist()
+        type_atoms = [structure.atoms[i] for i in type_atoms.tolist()]
+        mass_dict = OrderedDict((type_id, atom.mass)
+                                for type_id, atom in zip(type_atom_ids, type_atoms))
+
+        write('\nMasses\n\n')
+        line = '{:d}\t{:.6f}\t# {}\n'.format
+        writelines(line(atom_type,mass,unique_types[atom_type-1])
+                   for atom_type,mass in mass_dict.items())
 
         if forcefield:
-        
-            epsilons = [atom.epsilon for atom in structure.atoms]
-            sigmas = [atom.sigma for atom in structure.atoms]
-            forcefields = [atom.type for atom in structure.atoms]
-            epsilon_dict = dict([(unique_types.index(atom_type)+1,epsilon) for atom_type,epsilon in zip(types,epsilons)])
-            sigma_dict = dict([(unique_types.index(atom_type)+1,sigma) for atom_type,sigma in zip(types,sigmas)])
-            forcefield_dict = dict([(unique_types.index(atom_type)+1,forcefield) for atom_type,forcefield in zip(types,forcefields)])
-            
-
+            epsilon_dict = OrderedDict((type_id, atom.epsilon)
+                                       for type_id, atom in zip(type_atom_ids, type_atoms))
+            sigma_dict = OrderedDict((type_id, atom.sigma)
+                                     for type_id, atom in zip(type_atom_ids, type_atoms))
+            forcefield_dict = OrderedDict((type_id, unique_types[type_id-1])
+                                          for type_id in type_atom_ids)
 
             # Modified cross-interactions
             if structure.has_NBFIX():
@@ -366,42 +415,45 @@ def write_lammpsdata(structure, filename, atom_style='full',
                 params.nbfix_types = new_nbfix_types
                 warn('Explicitly writing cross interactions using mixing rule: {}'.format(
                     structure.combining_rule))
+                # Mixing rules for all type pairs, as (n_types, n_types) arrays
+                n_types = len(unique_types)
+                type_sigmas = np.array([sigma_dict[i+1] for i in range(n_types)])
+                type_epsilons = np.array([epsilon_dict[i+1] for i in range(n_types)])
+                if structure.combining_rule == 'lorentz':
+                    pair_sigmas = 0.5 * (type_sigmas[:, None] + type_sigmas[None, :])
+                elif structure.combining_rule == 'geometric':
+                    pair_sigmas = np.sqrt(type_sigmas[:, None] * type_sigmas[None, :])
+                else:
+                    raise ValueError('Only lorentz and geometric combining rules are supported')
+                pair_epsilons = np.sqrt(type_epsilons[:, None] * type_epsilons[None, :])
+                # Might not be necessary to be this explicit
+                np.fill_diagonal(pair_sigmas, type_sigmas)
+                np.fill_diagonal(pair_epsilons, type_epsilons)
+
                 coeffs = OrderedDict()
-                for combo in it.combinations_with_replacement(unique_types, 2):
+                for i, j in zip(*np.triu_indices(n_types)):
+                    combo = (unique_types[i], unique_types[j])
                     # Attempt to find pair coeffis in nbfixes
                     if combo in params.nbfix_types:
-                        type1 = unique_types.index(combo[0])+1
-                        type2 = unique_types.index(combo[1])+1
                         rmin = params.nbfix_types[combo][0] # Angstrom
                         epsilon = params.nbfix_types[combo][1] # kcal
                         sigma = rmin/2**(1/6)
-                        coeffs[(type1, type2)] = (round(sigma, 8), round(epsilon, 8))
                     else:
-                        type1 = unique_types.index(combo[0]) + 1
-                        type2 = unique_types.index(combo[1]) + 1
-                        # Might not be necessary to be this explicit
-                        if type1 == type2:
-                            sigma = sigma_dict[type1]
-                            epsilon = epsilon_dict[type1]
-                        else:
-                            if structure.combining_rule == 'lorentz':
-                                sigma = (sigma_dict[type1]+sigma_dict[type2])*0.5
-                            elif structure.combining_rule == 'geometric':
-                                sigma = (sigma_dict[type1]*sigma_dict[type2])**0.5
-                            else:
-                                raise ValueError('Only lorentz and geometric combining rules are supported')
-                            epsilon = (epsilon_dict[type1]*epsilon_dict[type2])**0.5
-                        coeffs[(type1, type2)] = (round(sigma, 8), round(epsilon, 8))
+                        sigma = float(pair_sigmas[i, j])
+                        epsilon = float(pair_epsilons[i, j])
+                    coeffs[(i+1, j+1)] = (round(sigma, 8), round(epsilon, 8))
                 if nbfix_in_data_file:
-                    data.write('\nPairIJ Coeffs # modified lj\n')
-                    data.write('# type1 type2 \tepsilon (kcal/mol) \tsigma (Angstrom)\n')
-                    for (type1, type2), (sigma, epsilon) in coeffs.items():
-                        data.write('{0} \t{1} \t{2} \t\t{3}\t\t# {4}\t{5}\n'.format(
-                            type1, type2, epsilon, sigma, forcefield_dict[type1], forcefield_dict[type2]))
+                    write('\nPairIJ Coeffs # modified lj\n')
+                    write('# type1 type2 \tepsilon (kcal/mol) \tsigma (Angstrom)\n')
+                    line = '{0} \t{1} \t{2} \t\t{3}\t\t# {4}\t{5}\n'.format
+                    writelines(line(
+                        type1, type2, epsilon, sigma, forcefield_dict[type1], forcefield_dict[type2])
+                        for (type1, type2), (sigma, epsilon) in coeffs.items())
                 else:
-                    data.write('\nPair Coeffs # lj\n\n')
-                    for idx,epsilon in epsilon_dict.items():
-                        data.write('{}\t{:.5f}\t{:.5f}\n'.format(idx,epsilon,sigma_dict[idx]))
+                    write('\nPair Coeffs # lj\n\n')
+                    line = '{}\t{:.5f}\t{:.5f}\n'.format
+                    writelines(line(idx,epsilon,sigma_dict[idx])
+                               for idx,epsilon in epsilon_dict.items())
                     print('Copy these commands into your input script:\n')
                     print('# type1 type2 \tepsilon (kcal/mol) \tsigma (Angstrom)\n')
                     for (type1, type2), (sigma, epsilon) in coeffs.items():
@@ -410,113 +462,261 @@ def write_lammpsdata(structure, filename, atom_style='full',
 
             # Pair coefficients
             else:
-                data.write('\nPair Coeffs # lj \n')
-                data.write('#\tepsilon (kcal/mol)\t\tsigma (Angstrom)\n')
-                for idx,epsilon in epsilon_dict.items():
-                    data.write('{}\t{:.5f}\t\t{:.5f}\t\t# {}\n'.format(idx,epsilon,sigma_dict[idx],forcefield_dict[idx]))
+                write('\nPair Coeffs # lj \n')
+                write('#\tepsilon (kcal/mol)\t\tsigma (Angstrom)\n')
+                line = '{}\t{:.5f}\t\t{:.5f}\t\t# {}\n'.format
+                writelines(line(idx,epsilon,sigma_dict[idx],forcefield_dict[idx])
+                           for idx,epsilon in epsilon_dict.items())
 
             # Bond coefficients
-            if bonds:
-                data.write('\nBond Coeffs # harmonic\n')
-                data.write('#\tk(kcal/mol/angstrom^2)\t\treq(angstrom)\n')
-                for params,idx in unique_bond_types.items():
-                    data.write('{}\t{}\t\t{}\t\t# {}\t{}\n'.format(idx,params[0],params[1],params[2][0],params[2][1]))
+            if len(bonds):
+                write('\nBond Coeffs # harmonic\n')
+                write('#\tk(kcal/mol/angstrom^2)\t\treq(angstrom)\n')
+                line = '{}\t{}\t\t{}\t\t# {}\t{}\n'.format
+                writelines(line(idx,params[0],params[1],params[2][0],params[2][1])
+                           for params,idx in unique_bond_types.items())
 
             # Angle coefficients
-            if angles:
+            if len(angles):
                 if use_urey_bradleys:
-                    data.write('\nAngle Coeffs # charmm\n')
-                    data.write('#\tk(kcal/mol/rad^2)\t\ttheteq(deg)\tk(kcal/mol/angstrom^2)\treq(angstrom)\n')
-                    for params,idx in unique_angle_types.items():
-                        data.write('{}\t{}\t{:.5f}\t{:.5f}\t{:.5f}\n'.format(idx,*params))
+                    write('\nAngle Coeffs # charmm\n')
+                    write('#\tk(kcal/mol/rad^2)\t\ttheteq(deg)\tk(kcal/mol/angstrom^2)\treq(angstrom)\n')
+                    line = '{}\t{}\t{:.5f}\t{:.5f}\t{:.5f}\n'.format
+                    writelines(line(idx,*params)
+                               for params,idx in unique_angle_types.items())
 
                 else:
-                    data.write('\nAngle Coeffs # harmonic\n')
-                    data.write('#\tk(kcal/mol/rad^2)\t\ttheteq(deg)\n')
-                    for params,idx in unique_angle_types.items():
-                        data.write('{}\t{}\t\t{:.5f}\t# {}\t{}\t{}\n'.format(idx,params[0],params[1],
-                                                                             params[3][0],params[2],params[3][1]))
+                    write('\nAngle Coeffs # harmonic\n')
+                    write('#\tk(kcal/mol/rad^2)\t\ttheteq(deg)\n')
+                    line = '{}\t{}\t\t{:.5f}\t# {}\t{}\t{}\n'.format
+                    writelines(line(idx,params[0],params[1],
+                                    params[3][0],params[2],params[3][1])
+                               for params,idx in unique_angle_types.items())
 
             # Dihedral coefficients
-            if dihedrals:
+            if len(dihedrals):
                 if use_rb_torsions:
-                    data.write('\nDihedral Coeffs # opls\n')
-                    data.write('#\tf1(kcal/mol)\tf2(kcal/mol)\tf3(kcal/mol)\tf4(kcal/mol)\n')
-                    for params,idx in unique_dihedral_types.items():
-                        opls_coeffs = RB_to_OPLS(params[0],
-                                                 params[1],
-                                                 params[2],
-                                                 params[3],
-                                                 params[4],
-                                                 params[5])
-                        data.write('{}\t{:.5f}\t{:.5f}\t\t{:.5f}\t\t{:.5f}\t# {}\t{}\t{}\t{}\n'.format(idx,opls_coeffs[0],
-                                                                                                       opls_coeffs[1],
-                                                                                                       opls_coeffs[2],
-                                                                                                       opls_coeffs[3],
-                                                                                                       params[8],params[9],
-                                                                                                       params[10],params[11]))
+                    write('\nDihedral Coeffs # opls\n')
+                    write('#\tf1(kcal/mol)\tf2(kcal/mol)\tf3(kcal/mol)\tf4(kcal/mol)\n')
+                    line = '{}\t{:.5f}\t{:.5f}\t\t{:.5f}\t\t{:.5f}\t# {}\t{}\t{}\t{}\n'.format
+                    writelines(line(
+                        idx, *(tuple(RB_to_OPLS(*params[:6])) + params[8:12]))
+                        for params,idx in unique_dihedral_types.items())
                 elif use_dihedrals:
-                    data.write('\nDihedral Coeffs # charmm\n')
-                    data.write('#k, n, phi, weight\n')
-                    for params, idx in unique_dihedral_types.items():
-                        data.write('{}\t{:.5f}\t{:d}\t{:d}\t{:.5f}\t# {}\t{}\t{}\t{}\n'.format(idx, params[0],
-                                                                                                params[1], params[2],
-                                                                                                params[3], params[6],
-                                                                                                params[7], params[8], params[9]))
+                    write('\nDihedral Coeffs # charmm\n')
+                    write('#k, n, phi, weight\n')
+                    line = '{}\t{:.5f}\t{:d}\t{:d}\t{:.5f}\t# {}\t{}\t{}\t{}\n'.format
+                    writelines(line(idx, params[0], params[1], params[2],
+                                    params[3], params[6], params[7],
+                                    params[8], params[9])
+                               for params, idx in unique_dihedral_types.items())
 
             # Improper coefficients
-            if impropers:
-                data.write('\nImproper Coeffs # harmonic\n')
-                data.write('#k, psi\n')
-                for params,idx in unique_improper_types.items():
-                    data.write('{}\t{:.5f}\t{:.5f}\t# {}\t{}\t{}\t{}\n'.format(idx, params[0],
-                                                                                params[1], params[2],
-                                                                                params[3], params[4],
-                                                                                params[5]))
+            if len(impropers):
+                write('\nImproper Coeffs # harmonic\n')
+                write('#k, psi\n')
+                line = '{}\t{:.5f}\t{:.5f}\t# {}\t{}\t{}\t{}\n'.format
+                writelines(line(idx, params[0], params[1], params[2],
+                                params[3], params[4], params[5])
+                           for params,idx in unique_improper_types.items())
 
         # Atom data
-        data.write('\nAtoms\n\n')
-        if atom_style == 'atomic':
-            atom_line = '{index:d}\t{type_index:d}\t{x:.6f}\t{y:.6f}\t{z:.6f}\n'
-        elif atom_style == 'charge':
-            atom_line = '{index:d}\t{type_index:d}\t{charge:.6f}\t{x:.6f}\t{y:.6f}\t{z:.6f}\n'
-        elif atom_style == 'molecular':
-            atom_line = '{index:d}\t{zero:d}\t{type_index:d}\t{x:.6f}\t{y:.6f}\t{z:.6f}\n'
-        elif atom_style == 'full':
-            atom_line ='{index:d}\t{zero:d}\t{type_index:d}\t{charge:.6f}\t{x:.6f}\t{y:.6f}\t{z:.6f}\n'
-
-        for i,coords in enumerate(xyz):
-            data.write(atom_line.format(
-                index=i+1,type_index=unique_types.index(types[i])+1,
-                zero=0,charge=charges[i],
-                x=coords[0],y=coords[1],z=coords[2]))
+        write('\nAtoms\n\n')
+        _ATOM_WRITERS[atom_style](write, {'type': type_ids.tolist(),
+                                          'charge': charges,
+                                          'x': xs, 'y': ys, 'z': zs})
 
         if atom_style in ['full', 'molecular']:
             # Bond data
-            if bonds:
-                data.write('\nBonds\n\n')
-                for i,bond in enumerate(bonds):
-                    data.write('{:d}\t{:d}\t{:d}\t{:d}\n'.format(
-                        i+1,bond_types[i],bond[0],bond[1]))
+            if len(bonds):
+                _write_topology_section(write, 'Bonds', bond_types, bonds)
 
             # Angle data
-            if angles:
-                data.write('\nAngles\n\n')
-                for i,angle in enumerate(angles):
-                    data.write('{:d}\t{:d}\t{:d}\t{:d}\t{:d}\n'.format(
-                        i+1,angle_types[i],angle[0],angle[1],angle[2]))
+            if len(angles):
+                _write_topology_section(write, 'Angles', angle_types, angles)
 
             # Dihedral data
-            if dihedrals:
-                data.write('\nDihedrals\n\n')
-                for i,dihedral in enumerate(dihedrals):
-                    data.write('{:d}\t{:d}\t{:d}\t{:d}\t{:d}\t{:d}\n'.format(
-                        i+1,dihedral_types[i],dihedral[0],
-                        dihedral[1],dihedral[2],dihedral[3]))
-            # Dihedral data
-            if impropers:
-                data.write('\nImpropers\n\n')
-                for i,improper in enumerate(impropers):
-                    data.write('{:d}\t{:d}\t{:d}\t{:d}\t{:d}\t{:d}\n'.format(
-                        i+1,improper_types[i],improper[2],
-                        improper[1],improper[0],improper[3]))
+            if len(dihedrals):
+                _write_topology_section(write, 'Dihedrals', dihedral_types, dihedrals)
+
+            # Improper data
+            if len(impropers):
+                _write_topology_section(write, 'Impropers', improper_types,
+                                        impropers[:, [2, 1, 0, 3]])
+
+
+@contextmanager
+def _maybe_open(filename):
+    """Open `filename` for writing, unless it is already a stream.
+
+    Files are opened in binary mode with a large buffer: the output is plain
+    ASCII, which skips the encoding and newline handling of a text file.
+    Streams are passed through and left open.
+    """
+    if hasattr(filename, 'write'):
+        yield filename
+    else:
+        with open(filename, 'wb', buffering=4<<20) as data:
+            yield data
+
+
+def _writers(data):
+    """Return `write` and `writelines` functions taking `str` for a stream.
+
+    Binary streams receive UTF-8 encoded bytes. Streams outside the `io`
+    hierarchy, such as those from `codecs.open` or `tempfile`, are treated as
+    binary if they reject an empty text write.
+    """
+    if isinstance(data, io.TextIOBase):
+        binary = False
+    elif isinstance(data, (io.RawIOBase, io.BufferedIOBase)):
+        binary = True
+    else:
+        try:
+            data.write(u'')
+            binary = False
+        except TypeError:
+            binary = True
+
+    if binary:
+        def write(text):
+            data.write(text.encode('utf-8'))
+
+        def writelines(lines):
+            data.writelines(line.encode('utf-8') for line in lines)
+    else:
+        text_type = type(u'')
+
+        def write(text):
+            data.write(text_type(text))
+
+        def writelines(lines):
+            data.writelines(text_type(line) for line in lines)
+    return write, writelines
+
+
+def _write_topology_section(write, title, type_ids, atom_indices):
+    """Write a Bonds, Angles, Dihedrals or Impropers section.
+
+    Parameters
+    ----------
+    write : callable
+        Writes a `str` to the LAMMPS data file
+    title : str
+        Name of the section
+    type_ids : array-like of int, shape=(n,)
+        Type id of each bond, angle, etc.
+    atom_indices : np.ndarray, shape=(n, m), dtype=int
+        1-based indices of the atoms in each bond, angle, etc.
+
+    """
+    n_items, n_atoms_per_item = atom_indices.shape
+    if len(type_ids) != n_items:
+        raise ValueError('Found {} {} but {} type ids for them'.format(
+            n_items, title.lower(), len(type_ids)))
+    line = '\t'.join(['%d'] * (n_atoms_per_item + 2)) + '\n'
+    rows = zip(range(1, n_items+1), np.asarray(type_ids).tolist(),
+               *atom_indices.T.tolist())
+    write('\n{}\n\n{}'.format(title, ''.join(map(line.__mod__, rows))))
+
+
+def _atom_indices(topology_items, n_atoms_per_item):
+    """Return the 1-based atom indices of ParmEd bonds, angles, etc.
+
+    Parameters
+    ----------
+    topology_items : list
+        ParmEd topology objects (e.g. `structure.bonds`) exposing `atom1`
+        through `atom<n_atoms_per_item>`
+    n_atoms_per_item : int
+        Number of atoms involved in each topology object
+
+    Returns
+    -------
+    indices : np.ndarray, shape=(len(topology_items), n_atoms_per_item), dtype=int
+
+    """
+    attrs = ['atom{}'.format(i+1) for i in range(n_atoms_per_item)]
+    indices = np.fromiter((getattr(item, attr).idx + 1
+                           for item in topology_items for attr in attrs),
+                          dtype=np.int64,
+                          count=len(topology_items) * n_atoms_per_item)
+    return indices.reshape(-1, n_atoms_per_item)
+
+
+def _round_columns(params, decimals):
+    """Round each column of a parameter table to a given number of decimals.
+
+    Parameters
+    ----------
+    params : array-like, shape=(n, m)
+        Force field parameters, one row per bond, angle, etc.
+    decimals : int or array-like of int, shape=(m,)
+        Number of decimals to round all columns, or each column, to
+
+    Returns
+    -------
+    rounded : np.ndarray, shape=(n, m), dtype=float
+        The rounded parameters
+
+    """
+    params = np.asarray(params, dtype=float)
+    decimals = np.broadcast_to(decimals, params.shape)
+    scale = 10.0 ** decimals
+    scaled = params * scale
+    rounded = np.rint(scaled) / scale
+    # Scaling is inexact, so values close to a tie may round differently
+    # than Python's correctly rounded `round`; recompute those exactly
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i, j in zip(*np.nonzero(near_tie)):
+        rounded[i, j] = round(float(params[i, j]), int(decimals[i, j]))
+    return rounded
+
+
+def _enumerate_unique(keys):
+    """Assign consecutive 1-based ids to the distinct values of `keys`.
+
+    Parameters
+    ----------
+    keys : list of hashable
+        Parameter tuples describing each bond, angle, dihedral or improper
+
+    Returns
+    -------
+    unique : OrderedDict
+        Maps each distinct key to its id, in order of first appearance
+    ids : list of int
+        The id of each entry of `keys`
+
+    """
+    unique = OrderedDict()
+    ids = [unique.setdefault(key, len(unique)+1) for key in keys]
+    return unique, ids
+
+
+def _enumerate_unique_rows(keys):
+    """Assign consecutive 1-based ids to the distinct rows of a numeric array.
+
+    This is the vectorized counterpart of `_enumerate_unique` for keys
+    that have been encoded as numbers, e.g. rounded parameters and atom
+    type codes.
+
+    Parameters
+    ----------
+    keys : np.ndarray, shape=(n, m)
+        One key per bond, angle, dihedral or improper
+
+    Returns
+    -------
+    first : np.ndarray, shape=(n_unique,), dtype=int
+        Index of the first row holding each distinct key, ordered by id
+    ids : np.ndarray, shape=(n,), dtype=int
+        The id of each row, numbered in order of first appearance
+
+    """
+    _, first, inverse = np.unique(keys, axis=0, return_index=True,
+                                  return_inverse=True)
+    order = np.argsort(first)
+    ids = np.empty_like(order)
+    ids[order] = np.arange(1, len(order)+1)
+    return first[order], ids[inverse.reshape(-1)]
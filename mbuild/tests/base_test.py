@@ -1,3 +1,5 @@
+import os
+
 import numpy as np
 import pytest
 
@@ -5,6 +7,28 @@ import mbuild as mb
 from mbuild.utils.geometry import calc_dihedral
 from mbuild.utils.io import get_fn
 
+# Forcefields are expensive to parse, so share them across the test session
+_forcefields = dict()
+
+
+def _load_forcefield(name=None, forcefield_files=None):
+    """Load a foyer Forcefield, reusing it if it was already loaded.
+
+    Forcefield files are keyed on their modification time as well, so an
+    edited file is parsed again.
+    """
+    if forcefield_files is not None:
+        forcefield_files = tuple(forcefield_files)
+        key = (name, tuple((fn, os.path.getmtime(fn)) for fn in forcefield_files))
+    else:
+        key = (name, None)
+    if key not in _forcefields:
+        from foyer import Forcefield
+        _forcefields[key] = Forcefield(
+            name=name,
+            forcefield_files=list(forcefield_files) if forcefield_files else None)
+    return _forcefields[key]
+
 
 class BaseTest:
 
@@ -17,6 +41,18 @@ class BaseTest:
         from mbuild.examples import Ethane
         return Ethane()
 
+    @pytest.fixture
+    def oplsaa(self):
+        return _load_forcefield(name='oplsaa')
+
+    @pytest.fixture
+    def ethane_oplsaa(self, ethane, oplsaa):
+        return oplsaa.apply(ethane)
+
+    @pytest.fixture
+    def charmm_ff(self):
+        return _load_forcefield(forcefield_files=[get_fn('charmm_truncated.xml')])
+
     @pytest.fixture
     def methane(self):
         from mbuild.examples import Methane
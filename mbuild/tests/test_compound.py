@@ -79,6 +79,17 @@ class TestCompound(BaseTest):
                 forcefield_files=get_fn('methane_oplssaa.xml'),
                 overwrite=True, foyerkwargs={})
 
+    @pytest.mark.skipif(not has_foyer, reason="Foyer is not installed")
+    def test_save_forcefield_object_or_name(self, methane):
+        from foyer import Forcefield
+        oplsaa = Forcefield(name='oplsaa')
+        methane.save('lythem.top', forcefield=oplsaa, overwrite=True)
+        methane.save('lythem.top', forcefield='oplsaa', overwrite=True)
+
+    def test_save_forcefield_bad_type(self, methane):
+        with pytest.raises(TypeError):
+            methane.save('lythem.top', forcefield=42, overwrite=True)
+
     def test_save_resnames(self, ch3, h2o):
         system = mb.Compound([ch3, h2o])
         system.save('resnames.gro', residues=['CH3', 'H2O'])
@@ -576,6 +587,45 @@ class TestCompound(BaseTest):
         assert struct.residues[2].name == 'Ethane'
         assert sum(len(res.atoms) for res in struct.residues) == len(struct.atoms)
 
+    def test_prefix_names(self, ethane):
+        names = [particle.name for particle in ethane.particles()]
+        ethane.prefix_names('_')
+        assert [particle.name for particle in ethane.particles()] == \
+            ['_' + name for name in names]
+        assert ethane.residue_names == {'CH3'}
+
+    def test_residue_names(self, h2o, ethane):
+        system = mb.Compound([h2o, ethane])
+        assert system.residue_names == {'H2O', 'CH3'}
+
+        h2o.name = 'Water'
+        assert system.residue_names == {'Water', 'CH3'}
+
+        system.remove(ethane)
+        assert system.residue_names == {'Water'}
+
+        system.add(mb.clone(h2o))
+        struct = system.to_parmed(residues=system.residue_names)
+        assert [res.name for res in struct.residues] == ['Water', 'Water']
+
+    def test_name_before_init(self):
+        class NamedEarly(mb.Compound):
+            def __init__(self):
+                self.name = 'foo'
+                super(NamedEarly, self).__init__()
+
+        class NamedOnClass(mb.Compound):
+            name = 'bar'
+
+        compound = NamedEarly()
+        assert compound.name == 'NamedEarly'
+
+        system = mb.Compound([NamedOnClass(name='baz')])
+        system.children[0].add(mb.Particle(name='C'))
+        assert system.residue_names == {'baz'}
+        system.children[0].name = 'qux'
+        assert system.residue_names == {'qux'}
+
     def test_parmed_element_guess(self):
         compound = mb.Particle(name='foobar')
         with pytest.warns(UserWarning):
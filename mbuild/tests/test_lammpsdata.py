@@ -1,4 +1,12 @@
+import codecs
+from contextlib import closing
+from io import BytesIO, StringIO
+import mmap
+import re
+import tempfile
+
 import numpy as np
+import parmed as pmd
 import pytest
 
 import mbuild as mb
@@ -7,87 +15,135 @@ from mbuild.utils.io import get_fn
 from mbuild.formats.lammpsdata import write_lammpsdata
 from mbuild.utils.io import has_foyer
 
+# The PairIJ Coeffs section runs from its title up to the next blank line
+_PAIRIJ_SECTION_RE = re.compile(br'^PairIJ Coeffs[^\n]*\n((?:[^\n]+\n)+)', re.M)
+_PAIRIJ_RE = re.compile(br'^[ \t]*(\d+)[ \t]+(\d+)[ \t]+(\S+)[ \t]+(\S+)', re.M)
+
 
-@pytest.mark.skipif(not has_foyer, reason="Foyer package not installed")
 class TestLammpsData(BaseTest):
 
     def test_save(self, ethane):
         ethane.save(filename='ethane.lammps')
 
-    def test_save_forcefield(self, ethane):
-        ethane.save(filename='ethane-opls.lammps', forcefield_name='oplsaa')
+    def test_save_streams(self, ethane):
+        structure = ethane.to_parmed()
+        write_lammpsdata(structure, 'ethane.lammps')
+        with open('ethane.lammps') as f:
+            expected = f.read()
+        header, _, body = expected.partition('\n')
+        assert header == 'ethane.lammps - created by mBuild'
+
+        default_header = 'LAMMPS data file - created by mBuild'
+        text = StringIO()
+        write_lammpsdata(structure, text)
+        binary = BytesIO()
+        write_lammpsdata(structure, binary)
+        outputs = [(default_header, text.getvalue()),
+                   (default_header, binary.getvalue().decode('utf-8'))]
+        # Text streams that are not io.TextIOBase instances
+        for stream in (tempfile.NamedTemporaryFile('w+'),
+                       tempfile.SpooledTemporaryFile(mode='w+')):
+            with stream:
+                write_lammpsdata(structure, stream)
+                stream.seek(0)
+                name = stream.name
+                if not isinstance(name, str):
+                    name = 'LAMMPS data file'
+                outputs.append((name + ' - created by mBuild', stream.read()))
+        # codecs writers report a binary mode but take text
+        with codecs.open('codecs.lammps', 'w', encoding='utf-8') as f:
+            write_lammpsdata(structure, f)
+        with open('codecs.lammps') as f:
+            outputs.append(('codecs.lammps - created by mBuild', f.read()))
+
+        for output_header, output in outputs:
+            assert output.partition('\n')[0] == output_header
+            assert output.partition('\n')[2] == body
+
+    def test_mismatched_dihedral_types(self):
+        # The improper gets no dihedral type id, so the Dihedrals section
+        # would otherwise be written short by one row
+        structure = pmd.Structure()
+        for i in range(5):
+            atom = pmd.Atom(name='C', type='C{}'.format(i), mass=12.0)
+            atom.xx, atom.xy, atom.xz = i, 0.0, 0.0
+            structure.add_atom(atom, 'RES', 1)
+        structure.box = [10, 10, 10, 90, 90, 90]
+        dihedral_type = pmd.DihedralType(1.0, 1, 0.0)
+        structure.dihedral_types.append(dihedral_type)
+        atoms = structure.atoms
+        structure.dihedrals.append(pmd.Dihedral(
+            atoms[0], atoms[1], atoms[2], atoms[3], type=dihedral_type))
+        structure.dihedrals.append(pmd.Dihedral(
+            atoms[1], atoms[2], atoms[3], atoms[4], improper=True,
+            type=dihedral_type))
+        with pytest.raises(ValueError):
+            write_lammpsdata(structure, StringIO())
 
     @pytest.mark.skipif(not has_foyer, reason="Foyer package not installed")
-    def test_save_charmm(self):
+    def test_save_forcefield(self, ethane, oplsaa):
+        ethane.save(filename='ethane-opls.lammps', forcefield=oplsaa)
+
+    @pytest.mark.skipif(not has_foyer, reason="Foyer package not installed")
+    def test_save_charmm(self, charmm_ff):
         cmpd = mb.load(get_fn('charmm_dihedral.mol2'))
-        for i in cmpd.particles():
-            i.name = "_{}".format(i.name)
+        cmpd.prefix_names('_')
         structure = cmpd.to_parmed(box=cmpd.boundingbox, 
-                                    residues=set([p.parent.name for \
-                                                 p in cmpd.particles()]))
+                                    residues={p.parent.name for
+                                              p in cmpd.particles()})
 
-        from foyer import Forcefield
-        ff = Forcefield(forcefield_files=[get_fn('charmm_truncated.xml')])
-        structure = ff.apply(structure, assert_dihedral_params=False)
+        structure = charmm_ff.apply(structure, assert_dihedral_params=False)
 
         from mbuild.formats.lammpsdata import write_lammpsdata
-        write_lammpsdata(structure, 'charmm_dihedral.lammps')
-        out_lammps = open('charmm_dihedral.lammps', 'r').readlines()
-        for i, line in enumerate(out_lammps):
-            if 'Angle Coeffs' in line:
-                assert '# charmm' in line
-                assert '#\tk(kcal/mol/rad^2)\t\ttheteq(deg)\tk(kcal/mol/angstrom^2)\treq(angstrom)\n' in out_lammps[i+1]
-                assert len(out_lammps[i+2].split('#')[0].split()) == 5
-            elif 'Dihedral Coeffs' in line:
-                assert '# charmm' in line
-                assert '#k, n, phi, weight' in out_lammps[i+1]
-                assert len(out_lammps[i+2].split('#')[0].split()) == 5
-            else:
-                pass
+        data = StringIO()
+        write_lammpsdata(structure, data)
+        out_lammps = data.getvalue()
+        sections = [('Angle Coeffs', '#\tk(kcal/mol/rad^2)\t\ttheteq(deg)\tk(kcal/mol/angstrom^2)\treq(angstrom)\n'),
+                    ('Dihedral Coeffs', '#k, n, phi, weight')]
+        for title, comment in sections:
+            start = out_lammps.find(title)
+            if start == -1:
+                continue
+            # Only slice out the title, comment and first coefficient lines
+            end = start
+            for _ in range(3):
+                end = out_lammps.find('\n', end) + 1
+            title_line, comment_line, coeff_line = out_lammps[start:end].splitlines(True)
+            assert '# charmm' in title_line
+            assert comment in comment_line
+            assert len(coeff_line.split('#')[0].split()) == 5
 
     @pytest.mark.skipif(not has_foyer, reason="Foyer package not installed")
-    def test_save_box(self, ethane):
+    def test_save_box(self, ethane, oplsaa):
         box = mb.Box(lengths=np.array([2.0, 2.0, 2.0]))
-        ethane.save(filename='ethane-box.lammps', forcefield_name='oplsaa', box=box)
-
-    def test_nbfix(self, ethane):
-        from foyer import Forcefield
+        ethane.save(filename='ethane-box.lammps', forcefield=oplsaa, box=box)
 
-        OPLSAA = Forcefield(name='oplsaa')
-        structure = OPLSAA.apply(ethane)
+    @pytest.mark.skipif(not has_foyer, reason="Foyer package not installed")
+    def test_nbfix(self, ethane_oplsaa):
+        structure = ethane_oplsaa
         # Add nbfixes
         types = list(set([a.atom_type for a in structure.atoms]))
         types[0].add_nbfix(types[1].name, 1.2, 2.1)
         types[1].add_nbfix(types[0].name, 1.2, 2.1)
         write_lammpsdata(filename='nbfix.lammps', structure=structure)
 
-        checked_section = False
-        with open('nbfix.lammps', 'r') as fi:
-            while not checked_section:
-                line = fi.readline()
-                if 'PairIJ Coeffs' in line:
-                    fi.readline()
-                    line = fi.readline().partition('#')[0]
-                    assert np.allclose(
-                        np.asarray(line.split(), dtype=float),
-                        [1, 1, 0.066, 3.5])
-                    line = fi.readline().partition('#')[0]
-                    assert np.allclose(
-                        np.asarray(line.split(), dtype=float),
-                        [1, 2, 2.1, 1.06907846])
-                    line = fi.readline().partition('#')[0]
-                    assert np.allclose(
-                        np.asarray(line.split(), dtype=float),
-                        [2, 2, 0.03, 2.5])
-                    line = fi.readline()
-                    checked_section = True
-                # Break if PairIJ Coeffs is not found
-                if 'Atoms' in line:
-                    break
-
-    def test_save_triclinic_box(self, ethane):
+        with open('nbfix.lammps', 'rb') as fi:
+            with closing(mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ)) as buf:
+                match = _PAIRIJ_SECTION_RE.search(buf)
+                assert match is not None
+                section = match.group(1)
+        parsed = np.array([[float(value) for value in match.groups()]
+                           for match in _PAIRIJ_RE.finditer(section)])
+        expected = np.array([[1, 1, 0.066, 3.5],
+                             [1, 2, 2.1, 1.06907846],
+                             [2, 2, 0.03, 2.5]])
+        assert parsed.shape == expected.shape
+        assert np.allclose(parsed, expected)
+
+    @pytest.mark.skipif(not has_foyer, reason="Foyer package not installed")
+    def test_save_triclinic_box(self, ethane, oplsaa):
         box = mb.Box(lengths=np.array([2.0, 2.0, 2.0]), angles=[60, 70, 80])
-        ethane.save(filename='triclinic-box.lammps', forcefield_name='oplsaa', box=box)
+        ethane.save(filename='triclinic-box.lammps', forcefield=oplsaa, box=box)
 
     @pytest.mark.parametrize(
         'atom_style, n_columns',
@@ -95,11 +151,11 @@ class TestLammpsData(BaseTest):
     ) 
     def test_writing_atom_styles(self, ethane, atom_style, n_columns):
         ethane.save(filename='ethane.lammps', atom_style=atom_style)
-        with open('ethane.lammps', 'r') as f:
-            for line in f:
-                if "Atoms" not in line:
-                    continue
-                    atoms_header = next(f)
-                    first_atom_line = next(f)
-                    columns = first_atom_line.split("\t")
-                    assert len(columns) == n_columns
+        with open('ethane.lammps', 'rb') as f:
+            with closing(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) as buf:
+                start = buf.find(b'\nAtoms\n')
+                assert start != -1
+                # Skip the section title and the blank line that follows it
+                start = buf.find(b'\n', buf.find(b'\n', start + 1) + 1) + 1
+                first_atom_line = buf[start:buf.find(b'\n', start)]
+        assert first_atom_line.count(b'\t') + 1 == n_columns
@@ -20,7 +20,6 @@ from __future__ import division, print_function
 import inspect
 import importlib
 import os
-from pkg_resources import resource_filename
 import sys
 import textwrap
 from unittest import SkipTest
@@ -78,6 +77,10 @@ or
 '''
 
 
+# Modules already resolved by import_, so repeated lookups are a dict hit
+_imported = dict()
+
+
 def import_(module):
     """Import a module, and issue a nice message to stderr if the module isn't installed.
 
@@ -101,7 +104,12 @@ def import_(module):
     >>> tables = import_('tables')
     """
     try:
-        return importlib.import_module(module)
+        return _imported[module]
+    except KeyError:
+        pass
+    try:
+        _imported[module] = importlib.import_module(module)
+        return _imported[module]
     except ImportError as e:
         try:
             message = MESSAGES[module]
@@ -124,40 +132,34 @@ def import_(module):
         raise DelayImportError(m)
 
 
-try:
-    import intermol
-    has_intermol = True
-    del intermol
-except ImportError:
-    has_intermol = False
-
-try:
-    import gsd
-    has_gsd = True
-    del gsd
-except ImportError:
-    has_gsd = False
-
-try:
-    import openbabel
-    has_openbabel = True
-    del openbabel
-except ImportError:
-    has_openbabel = False
-
-try:
-    import foyer
-    has_foyer = True
-    del foyer
-except ImportError:
-    has_foyer = False
-
-try:
-    import networkx
-    has_networkx = True
-    del networkx
-except ImportError:
-    has_networkx = False
+def _module_exists(module):
+    """Check whether a top-level module is installed without importing it."""
+    try:
+        from importlib.util import find_spec
+    except ImportError:  # Python 2
+        import imp
+        try:
+            imp.find_module(module)
+        except ImportError:
+            return False
+        return True
+    return find_spec(module) is not None
+
+
+has_intermol = _module_exists('intermol')
+has_gsd = _module_exists('gsd')
+has_openbabel = _module_exists('openbabel')
+has_foyer = _module_exists('foyer')
+has_networkx = _module_exists('networkx')
+
+
+# Reference files are installed next to this module
+_REFERENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'reference')
+
+# Reference file paths already resolved by get_fn
+_reference_fns = dict()
+
 
 def get_fn(name):
     """Get the full path to one of the reference files shipped for utils.
@@ -172,9 +174,14 @@ def get_fn(name):
         Name of the file to load (with respect to the reference/ folder).
 
     """
-    fn = resource_filename('mbuild', os.path.join('utils', 'reference', name))
+    try:
+        return _reference_fns[name]
+    except KeyError:
+        pass
+    fn = os.path.join(_REFERENCE_DIR, name)
     if not os.path.exists(fn):
         raise IOError('Sorry! {} does not exists.'.format(fn))
+    _reference_fns[name] = fn
     return fn
 
 